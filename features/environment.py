@@ -1,12 +1,16 @@
-import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
-from databricks.sdk import WorkspaceClient
 from dotenv import load_dotenv
 
-from setup.create_test_clustering_tables import set_dbx_tables
-
+# Loaded once for the whole run, before any module reads the environment at import time
 load_dotenv()
 
+from features.steps.databricks_utils import (
+    clear_metadata_cache, create_workspace_client, list_tables_in_schema, schema_table_names
+)
+from setup.create_test_clustering_tables import WAREHOUSE_ID, drop_table_if_exists, set_dbx_tables
+
 CATALOG = "workspace"
 SCHEMA = "test_clustering"
 
@@ -17,8 +21,8 @@ SKIP_TEST_TEARDOWN = False
 # NOTE: In production repositories we wont need to create these as we'll use the existing tables
 #       For testing we need to create some dbx objects
 def before_all(context):
-    # Set up Databricks client
-    context.dbx = WorkspaceClient()
+    # Set up the Databricks client shared by every step
+    context.dbx = create_workspace_client()
     context.catalog_schema = f"{CATALOG}.{SCHEMA}"
     
     # Load configuration from environment or defaults
@@ -31,17 +35,44 @@ def before_all(context):
     if SKIP_TEST_SETUP:
         print("Skipping test setup")
         return
-    set_dbx_tables(catalog=CATALOG, schema=SCHEMA)
+    set_dbx_tables(catalog=CATALOG, schema=SCHEMA, dbx=context.dbx)
+    # The existence checks' table set is cached for the run, so forget anything listed before the DDL
+    schema_table_names.cache_clear()
+
+
+def before_scenario(context, scenario):
+    # Underscore attributes live outside behave's context stack so are reset by hand
+    context._tables_cache = {}
+    context._columns_cache = {}
+    context._clustering_cache = {}
+    # One clock reading per scenario so every table is aged against the same instant
+    context._now_utc = datetime.now(timezone.utc)
+    clear_metadata_cache()
+    
+    # Parse the thresholds once rather than in every per-table / per-job check
+    userdata = context.config.userdata
+    context.vacuum_days_threshold = int(userdata['VACUUM_DAYS_THRESHOLD'])
+    context.orphan_days_threshold = int(userdata['ORPHAN_DAYS_THRESHOLD'])
+    context.min_timeout_seconds = int(userdata['MIN_TIMEOUT_SECONDS'])
+    context.max_timeout_seconds = int(userdata['MAX_TIMEOUT_SECONDS'])
 
 
 def after_all(context):
     if SKIP_TEST_TEARDOWN:
         print("Skipping test teardown")
         return
-    dbx = WorkspaceClient()
-    dbx.statement_execution.execute_statement(
+    # Drop the tables concurrently, CASCADE would drop them one after another.
+    # The schema may not exist if setup failed, DROP SCHEMA IF EXISTS still runs
+    try:
+        tables = list_tables_in_schema(context.dbx, CATALOG, SCHEMA)
+    except RuntimeError:
+        tables = []
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda table: drop_table_if_exists(context.dbx, CATALOG, SCHEMA, table), tables))
+    context.dbx.statement_execution.execute_statement(
         statement=f"DROP SCHEMA IF EXISTS {CATALOG}.{SCHEMA} CASCADE",
         catalog=CATALOG,
         schema=SCHEMA,
-        warehouse_id=os.getenv("DATABRICKS_WAREHOUSE_ID")
+        warehouse_id=WAREHOUSE_ID
     )
+    schema_table_names.cache_clear()
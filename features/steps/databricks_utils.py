@@ -1,24 +1,105 @@
 import os
-from typing import Any, Callable, Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Optional, Tuple
 from databricks.sdk import WorkspaceClient
-import json
+from databricks.sdk.config import Config
+from databricks.sdk.service.sql import (
+    Disposition, ExecuteStatementRequestOnWaitTimeout, Format, StatementParameterListItem, StatementState
+)
+import orjson
 
+WAREHOUSE_ID = os.getenv("DATABRICKS_WAREHOUSE_ID")
+# Number of tables checked concurrently by for_each_table, checks are I/O bound warehouse calls
+PARALLELISM = int(os.getenv("DBX_PARALLEL", "16"))
+# HTTP connections kept alive per host, enough for every for_each_table worker to hold one
+HTTP_POOL_SIZE = max(PARALLELISM, 32)
+# for_each_table stops checking once this many tables have failed
+MAX_FAILURES = int(os.getenv("DBX_MAX_FAILURES", "50"))
+# A statement still pending or running after this long is cancelled and raises
+QUERY_TIMEOUT_SECONDS = int(os.getenv("DBX_QUERY_TIMEOUT", "600"))
+# Per table metadata lookups are memoised, see clear_metadata_cache
+METADATA_CACHE_SIZE = 2048
 
-def _execute_query(dbx: WorkspaceClient, query: str, catalog: str = None, schema: str = None) -> Any:
-    return dbx.statement_execution.get_statement(
-        dbx.statement_execution.execute_statement(
-            statement=query,
-            warehouse_id=os.getenv("DATABRICKS_WAREHOUSE_ID"),
-            catalog=catalog,
-            schema=schema,
-        ).statement_id
+
+_PENDING_STATES = {StatementState.PENDING, StatementState.RUNNING}
+_metadata_caches = []
+
+# Most DESCRIBE DETAIL flags are one of these literals, skip the JSON parser for them.
+# The parsed values are shared and must not be mutated.
+_JSON_LITERALS = {"true": True, "false": False, "[]": []}
+
+
+def _execute_query(
+    dbx: WorkspaceClient, query: str, catalog: str = None, schema: str = None, parameters: dict[str, str] = None
+) -> Any:
+    # The warehouse holds the request for up to wait_timeout and returns the result inline,
+    # only statements still running after that need polling
+    result = dbx.statement_execution.execute_statement(
+        statement=query,
+        warehouse_id=WAREHOUSE_ID,
+        catalog=catalog,
+        schema=schema,
+        parameters=[StatementParameterListItem(name=k, value=v) for k, v in (parameters or {}).items()] or None,
+        wait_timeout="30s",
+        on_wait_timeout=ExecuteStatementRequestOnWaitTimeout.CONTINUE,
+        format=Format.JSON_ARRAY,
+        disposition=Disposition.INLINE,
     )
+    delay = 0.1
+    deadline = time.monotonic() + QUERY_TIMEOUT_SECONDS
+    while result.status and result.status.state in _PENDING_STATES:
+        if time.monotonic() >= deadline:
+            dbx.statement_execution.cancel_execution(result.statement_id)
+            raise TimeoutError(f"Query did not finish within {QUERY_TIMEOUT_SECONDS}s: {query}")
+        time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+        result = dbx.statement_execution.get_statement(result.statement_id)
+    # A failed statement has no result, raise rather than let it read as zero rows
+    state = result.status.state if result.status else None
+    if state != StatementState.SUCCEEDED:
+        error = result.status.error.message if result.status and result.status.error else "no error message"
+        raise RuntimeError(f"Query {state.value if state else 'returned no status'} ({error}): {query}")
+    return result
+
+
+def iter_rows(dbx: WorkspaceClient, result) -> Iterator[list]:
+    """
+    Yield every row of a statement result. Large INLINE results are split into chunks, only the
+    first of which comes back with the statement, so the rest are fetched by index.
+    """
+    chunk = result.result
+    while chunk:
+        yield from chunk.data_array or []
+        if chunk.next_chunk_index is None:
+            return
+        chunk = dbx.statement_execution.get_statement_result_chunk_n(result.statement_id, chunk.next_chunk_index)
+
+
+def metadata_cache(fn: Callable) -> Callable:
+    """Memoise a metadata lookup until the next clear_metadata_cache call."""
+    cached = lru_cache(maxsize=METADATA_CACHE_SIZE)(fn)
+    _metadata_caches.append(cached)
+    return cached
+
+
+def _quote_identifier(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def loads_json(value: str) -> Any:
+    """Parse a JSON string returned by the warehouse."""
+    if value in _JSON_LITERALS:
+        return _JSON_LITERALS[value]
+    return orjson.loads(value)
 
 
 def _describe_as_json(dbx, query: str, catalog: str, schema: str) -> dict[str, Any]:
     result = _execute_query(dbx, query, catalog, schema)
     if result.result and result.result.data_array:
-        return json.loads(result.result.data_array[0][0])
+        return orjson.loads(result.result.data_array[0][0])
     return {}
 
 
@@ -26,49 +107,185 @@ def for_each_table(
     context: Any,
     catalog_schema: str,
     check_fn: Callable[[dict[str, Any], str, str, str], bool],
-    fail_attr: str
+    fail_attr: str,
+    max_failures: int = MAX_FAILURES,
+    parallelism: int = PARALLELISM
 ) -> None:
     """ 
     Iterate over each table in the specified catalog and schema, applying a check function.
     If the check fails, the table is added to the context's fail_attr list.
+
+    Table level details for every table are fetched up front in a single information_schema
+    query, so checks that only need those fields cost no further warehouse round trips.
+    Checks run concurrently on a pool of parallelism threads; failures are reported in table order.
+    Checks must return their result rather than write to the context.
+    Once max_failures tables have failed the checks not yet started are cancelled; how many were
+    skipped is set on <fail_attr>_truncated (0 when every table was checked), see truncation_note.
     """
     # TODO: improve - a bit flimsy / misleading
     parts = catalog_schema.split(".")
     catalog = parts[0]
-    schemas = [parts[1]] if len(parts) > 1 else list_schemas_in_catalog(context.dbx, catalog)
+    details_by_schema = get_table_details(context, catalog, parts[1] if len(parts) > 1 else None)
     failed = []
-    for schema in schemas:
-        for table in list_tables_in_schema(context.dbx, catalog, schema):
-            detail = get_table_detail(context.dbx, catalog, schema, table)
-            if not check_fn(detail, catalog, schema, table):
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        checks = [
+            (executor.submit(check_fn, detail, catalog, schema, table), schema, table)
+            for schema, details in details_by_schema.items()
+            for table, detail in details.items()
+        ]
+        for check, schema, table in checks:
+            if check.cancelled():
+                skipped += 1
+            elif not check.result():
                 failed.append(f"{catalog}.{schema}.{table}")
+                if len(failed) == max_failures:
+                    # Checks already running still finish and are reported
+                    executor.shutdown(wait=False, cancel_futures=True)
     setattr(context, fail_attr, failed)
+    setattr(context, f"{fail_attr}_truncated", skipped)
+
+
+def truncation_note(context, fail_attr: str) -> str:
+    """Suffix for assertion messages when for_each_table stopped before checking every table."""
+    skipped = getattr(context, f"{fail_attr}_truncated", 0)
+    return f" ({skipped} tables not checked after {len(getattr(context, fail_attr, []))} failures)" if skipped else ""
 
 
-def list_schemas_in_catalog(dbx: WorkspaceClient, catalog: str) -> list[str]:
-    result = _execute_query(dbx, f"SHOW SCHEMAS IN {catalog}", catalog)
-    return [row[0] for row in getattr(result.result, 'data_array', []) if row and len(row) > 0]
+# information_schema.tables columns mapped onto the equivalent DESCRIBE DETAIL keys.
+# last_altered only tracks changes to the table definition, not data writes, so it is not lastModified.
+_TABLE_DETAIL_COLUMNS = {
+    "comment": "description",
+    "data_source_format": "format",
+    "created": "createdAt",
+    "last_altered": "lastAltered",
+}
+
+
+def list_table_details(dbx: WorkspaceClient, catalog: str, schema: Optional[str] = None) -> dict[str, dict[str, dict[str, Any]]]:
+    """
+    Get table level details for every table in a schema (or the whole catalog) in one query.
+    Returns {schema: {table: detail}} where detail uses the DESCRIBE DETAIL key names.
+    Fields only available from DESCRIBE DETAIL (e.g. clusteringColumns) need get_table_detail.
+    Views are left out, DESCRIBE DETAIL / HISTORY fail on them.
+    """
+    where = "table_schema = :schema" if schema else "table_schema <> 'information_schema'"
+    where += " AND table_type IN ('MANAGED', 'EXTERNAL')"
+    query = (
+        f"SELECT table_schema, table_name, {', '.join(_TABLE_DETAIL_COLUMNS)} "
+        f"FROM {_quote_identifier(catalog)}.information_schema.tables WHERE {where} ORDER BY table_schema, table_name"
+    )
+    result = _execute_query(dbx, query, catalog, parameters={"schema": schema} if schema else None)
+    details: dict[str, dict[str, dict[str, Any]]] = {}
+    for row in iter_rows(dbx, result):
+        table_schema, table_name, *values = row
+        detail = dict(zip(_TABLE_DETAIL_COLUMNS.values(), values))
+        detail["name"] = f"{catalog}.{table_schema}.{table_name}"
+        details.setdefault(table_schema, {})[table_name] = detail
+    return details
+
+
+def get_table_details(context, catalog: str, schema: Optional[str] = None) -> dict[str, dict[str, dict[str, Any]]]:
+    """list_table_details, memoised on context._tables_cache for the rest of the scenario."""
+    key = (catalog, schema)
+    if key not in context._tables_cache:
+        context._tables_cache[key] = list_table_details(get_workspace_client(context), catalog, schema)
+    return context._tables_cache[key]
 
 
 def list_tables_in_schema(dbx: WorkspaceClient, catalog: str, schema: str) -> list[str]:
     result = _execute_query(dbx, f"SHOW TABLES IN {catalog}.{schema}", catalog, schema)
-    return [row[1] for row in getattr(result.result, 'data_array', []) if row and len(row) > 1]
+    return [row[1] for row in iter_rows(dbx, result) if row and len(row) > 1]
+
 
+@lru_cache(maxsize=None)
+def schema_table_names(dbx: WorkspaceClient, catalog: str, schema: str) -> frozenset[str]:
+    """
+    The tables (and views) in a schema as a set, listed once per run. Unlike the metadata caches it
+    survives between scenarios; code that creates or drops tables must call its cache_clear.
+    """
+    return frozenset(list_tables_in_schema(dbx, catalog, schema))
+
+
+# DESCRIBE DETAIL returns the same columns, in the same order, for every Delta table
+_DESCRIBE_DETAIL_COLS = (
+    "format", "id", "name", "description", "location", "createdAt", "lastModified", "partitionColumns",
+    "clusteringColumns", "numFiles", "sizeInBytes", "properties", "minReaderVersion", "minWriterVersion",
+    "tableFeatures", "statistics", "clusterByAuto",
+)
 
+
+# Whether the warehouse's DESCRIBE schema matched each expected column tuple, checked on first use
+_describe_schema_matches: dict[tuple[str, ...], bool] = {}
+
+
+def describe_columns(result, expected: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Column names of a DESCRIBE result. The manifest's names are compared with the expected fixed
+    schema once per run; if they match, later results reuse the expected tuple (and any indices
+    precomputed from it), otherwise every result's names are read from its manifest.
+    """
+    matches = _describe_schema_matches.get(expected)
+    if matches is None:
+        columns = tuple(col.name for col in result.manifest.schema.columns)
+        matches = _describe_schema_matches[expected] = columns == expected
+        return expected if matches else columns
+    return expected if matches else tuple(col.name for col in result.manifest.schema.columns)
+
+
+@metadata_cache
 def get_table_detail(dbx: WorkspaceClient, catalog: str, schema: str, table: str) -> dict[str, Any]:
     result = _execute_query(dbx, f"DESCRIBE DETAIL {catalog}.{schema}.{table}", catalog, schema)
     if result.result and result.result.data_array:
-        columns = [col.name for col in result.manifest.schema.columns]
-        values = result.result.data_array[0]
-        return dict(zip(columns, values))
+        columns = describe_columns(result, _DESCRIBE_DETAIL_COLS)
+        return dict(zip(columns, result.result.data_array[0]))
     return {}
 
 
-def get_table_metadata(dbx, catalog: str, schema: str, table: str) -> dict[str, Any]:
-    query = f"DESCRIBE EXTENDED {catalog}.{schema}.{table} AS JSON"
-    return _describe_as_json(dbx, query, catalog, schema)
+# One lock per schema wide lookup, so only the first of for_each_table's concurrent checks runs it
+# and a slow lookup of one kind doesn't hold up the other
+_clustering_lock = threading.Lock()
+_columns_lock = threading.Lock()
+
+
+def _memoise_on_context(cache: dict, key: Tuple[str, str], lock: threading.Lock, load: Callable[[], Any]) -> Any:
+    """Return cache[key], loading it under lock on a miss. Hits never touch the lock."""
+    if key not in cache:
+        with lock:
+            if key not in cache:
+                cache[key] = load()
+    return cache[key]
+
+
+def get_table_clustering_info(context, catalog: str, schema: str) -> dict[str, tuple[list, bool, bool]]:
+    """list_table_clustering, memoised on context._clustering_cache for the rest of the scenario."""
+    return _memoise_on_context(
+        context._clustering_cache, (catalog, schema), _clustering_lock,
+        lambda: list_table_clustering(get_workspace_client(context), catalog, schema)
+    )
+
+
+def list_table_clustering(dbx: WorkspaceClient, catalog: str, schema: str) -> dict[str, tuple[list, bool, bool]]:
+    """
+    Get (clustering columns, cluster by auto, cluster_exclusion set) for every table in a schema from
+    one paginated Unity Catalog listing, instead of a DESCRIBE DETAIL and SHOW TBLPROPERTIES per table.
+    """
+    clustering = {}
+    for table in dbx.tables.list(catalog_name=catalog, schema_name=schema, omit_columns=True):
+        clustering[table.name] = parse_clustering(table.properties or {})
+    return clustering
+
+
+def parse_clustering(properties: dict[str, Any]) -> tuple[list, bool, bool]:
+    """Parse (clustering columns, cluster by auto, cluster_exclusion set) from a table's properties."""
+    return (
+        loads_json(properties.get("clusteringColumns") or "[]"),
+        loads_json(properties.get("clusterByAuto") or "false") is True,
+        properties.get("cluster_exclusion") in {"true", "1"},
+    )
 
 
+@metadata_cache
 def get_table_extended_properties(dbx, catalog: str, schema: str, table: str) -> dict[str, Any]:
     query = f"DESCRIBE TABLE EXTENDED {catalog}.{schema}.{table} AS JSON"
     return _describe_as_json(dbx, query, catalog, schema)
@@ -76,45 +293,73 @@ def get_table_extended_properties(dbx, catalog: str, schema: str, table: str) ->
 
 def get_column_metadata(context, table_name: str) -> list[dict]:
     """Get column information including comments."""
-    query = f"DESCRIBE TABLE EXTENDED {table_name}"
-    result = execute_query(context, query)
-    
-    columns = []
-    for row in result:
-        if row.get('col_name') and not row['col_name'].startswith('#'):
-            columns.append({
-                'name': row['col_name'],
-                'type': row.get('data_type'),
-                'comment': row.get('comment')
-            })
-    
+    catalog, schema, table = table_name.split(".", 2)
+    return get_schema_columns(context, catalog, schema).get(table, [])
+
+
+def get_schema_columns(context, catalog: str, schema: str) -> dict[str, list[dict]]:
+    """list_schema_columns, memoised on context._columns_cache for the rest of the scenario."""
+    return _memoise_on_context(
+        context._columns_cache, (catalog, schema), _columns_lock,
+        lambda: list_schema_columns(get_workspace_client(context), catalog, schema)
+    )
+
+
+def list_schema_columns(dbx: WorkspaceClient, catalog: str, schema: str) -> dict[str, list[dict]]:
+    """Get the columns of every table in a schema in one information_schema query, keyed by table."""
+    query = (
+        f"SELECT table_name, column_name, full_data_type, comment, partition_index "
+        f"FROM {_quote_identifier(catalog)}.information_schema.columns "
+        "WHERE table_schema = :schema ORDER BY table_name, ordinal_position"
+    )
+    result = _execute_query(dbx, query, catalog, parameters={"schema": schema})
+    columns: dict[str, list[dict]] = {}
+    for table_name, column_name, data_type, comment, partition_index in iter_rows(dbx, result):
+        columns.setdefault(table_name, []).append({
+            'name': column_name,
+            'type': data_type,
+            'comment': comment,
+            'partition_index': partition_index
+        })
     return columns
 
 
 def get_table_properties(context, table_name: str) -> dict:
     """Get table properties including custom tags."""
-    query = f"SHOW TBLPROPERTIES {table_name}"
-    result = execute_query(context, query)
-    
-    properties = {}
-    for row in result:
-        properties[row['key']] = row['value']
-    
-    return properties
+    return _get_table_properties(get_workspace_client(context), table_name)
+
+
+@metadata_cache
+def _get_table_properties(dbx: WorkspaceClient, table_name: str) -> dict:
+    result = _execute_query(dbx, f"SHOW TBLPROPERTIES {table_name}")
+    return {row[0]: row[1] for row in getattr(result.result, 'data_array', None) or [] if row and len(row) > 1}
+
+
+def clear_metadata_cache() -> None:
+    """
+    Forget memoised table metadata. The cached dicts are shared between callers and must not be
+    mutated; clearing them once per scenario (or after a step runs DDL) keeps results fresh.
+    """
+    for cached in _metadata_caches:
+        cached.cache_clear()
+
+
+def create_workspace_client() -> WorkspaceClient:
+    """Create a workspace client whose connection pool can serve for_each_table's workers."""
+    return WorkspaceClient(config=Config(max_connection_pools=HTTP_POOL_SIZE, max_connections_per_pool=HTTP_POOL_SIZE))
+
+
+_client_lock = threading.Lock()
 
 
 def get_workspace_client(context) -> WorkspaceClient:
-    """Get or create a Databricks workspace client."""
-    if not hasattr(context, 'workspace_client'):
-        context.workspace_client = WorkspaceClient()
-    return context.workspace_client
+    """Get the shared Databricks workspace client, creating it if needed. Safe to call from checks."""
+    with _client_lock:
+        if not hasattr(context, 'dbx'):
+            context.dbx = create_workspace_client()
+    return context.dbx
 
 
 def execute_query(context, query: str) -> Any:
     """Execute a query using the context's Databricks client."""
-    if hasattr(context, 'dbx'):
-        return _execute_query(context.dbx, query)
-    else:
-        # Use workspace client if dbx not available
-        client = get_workspace_client(context)
-        return _execute_query(client, query)
+    return _execute_query(get_workspace_client(context), query)
@@ -1,12 +1,13 @@
+import re
 from behave import given, when, then
-from features.steps.databricks_utils import for_each_table, get_column_metadata
+from features.steps.databricks_utils import for_each_table, get_column_metadata, truncation_note
 
 
 @then('each table should have a non-empty "comment" field')
 def step_check_table_comments(context):
     """Validate that all tables have meaningful comments."""
     def check_table_comment(detail, catalog, schema, table):
-        comment = detail.get('comment', '').strip() if detail.get('comment') else ''
+        comment = detail.get('description', '').strip() if detail.get('description') else ''
         if not comment:
             return False
         
@@ -24,7 +25,7 @@ def step_check_non_generic_comments(context):
     """Validate that table comments are not generic."""
     # This is covered by the previous step, but can be used separately
     assert not hasattr(context, 'tables_without_documentation') or not context.tables_without_documentation, \
-        f"Tables with missing or generic documentation: {getattr(context, 'tables_without_documentation', [])}"
+        f"Tables with missing or generic documentation: {getattr(context, 'tables_without_documentation', [])}{truncation_note(context, 'tables_without_documentation')}"
 
 
 @then('at least {threshold:d}% of columns per table should have descriptions')
@@ -47,17 +48,12 @@ def step_check_column_documentation(context, threshold):
 @then('critical columns (containing "{patterns}") must have descriptions')
 def step_check_critical_columns(context, patterns):
     """Ensure critical columns are documented."""
-    critical_patterns = [p.strip() for p in patterns.split(',')]
+    # Feature files quote each pattern ("id", "date"), one case-insensitive alternation covers them all
+    critical_patterns = [p.strip().strip('"') for p in patterns.split(',')]
+    critical_re = re.compile("|".join(map(re.escape, critical_patterns)), re.IGNORECASE)
     
     def check_critical_column_docs(detail, catalog, schema, table):
         columns = get_column_metadata(context, f"{catalog}.{schema}.{table}")
-        
-        for col in columns:
-            col_name = col['name'].lower()
-            is_critical = any(pattern in col_name for pattern in critical_patterns)
-            if is_critical and not col.get('comment'):
-                return False
-        
-        return True
+        return not any(critical_re.search(col['name']) and not col.get('comment') for col in columns)
     
     for_each_table(context, context.catalog_schema, check_critical_column_docs, 'tables_with_undocumented_critical_columns')
\ No newline at end of file
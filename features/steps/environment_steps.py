@@ -1,12 +1,11 @@
 from behave import given
-from databricks.sdk import WorkspaceClient
+from features.steps.databricks_utils import get_workspace_client
 
-from dotenv import load_dotenv
-load_dotenv()
 
 @given("I connect to the Databricks workspace")
 def step_connect_to_databricks(context):
-    context.dbx = WorkspaceClient()
+    # Reuse the client from before_all, building one runs auth discovery over HTTP
+    get_workspace_client(context)
 
 
 @given("a threshold of {threshold:d}% column documentation")
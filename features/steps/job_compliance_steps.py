@@ -18,26 +18,27 @@ def step_check_job_permissions(context):
 @when('I check all jobs in the workspace')
 def step_get_all_jobs(context):
     """Retrieve all jobs for validation."""
-    context.all_jobs = list_all_jobs(context)
+    context.all_jobs = tuple(iter_jobs(context))
 
 
 @when('I check jobs with "{pattern}" in their name')
 def step_filter_jobs_by_name(context, pattern):
     """Filter jobs by name pattern."""
-    all_jobs = list_all_jobs(context)
-    context.filtered_jobs = [job for job in all_jobs if pattern.lower() in job['name'].lower()]
+    pattern = pattern.lower()
+    context.filtered_jobs = [job for job in iter_jobs(context) if pattern in job.settings.name.lower()]
 
 
 @when('I check each job\'s timeout configuration')
 def step_check_job_timeouts(context):
     """Check timeout configuration for all jobs."""
-    context.all_jobs = list_all_jobs(context)
+    context.all_jobs = tuple(iter_jobs(context))
 
 
 @when('I check each job\'s cluster configuration')
 def step_check_job_clusters(context):
     """Check cluster configuration for all jobs."""
-    context.all_jobs = list_all_jobs(context)
+    # The cluster check inspects each task, which jobs.list only returns when expanded
+    context.all_jobs = tuple(iter_jobs(context, expand_tasks=True))
 
 
 @then('no job should have a run_as containing "@"')
@@ -46,10 +47,10 @@ def step_check_no_user_accounts(context):
     context.jobs_with_user_accounts = []
     
     for job in context.all_jobs:
-        is_compliant, issue = check_service_principal(job['settings'])
+        is_compliant, issue = check_service_principal(job.settings)
         if not is_compliant and '@' in str(issue):
             context.jobs_with_user_accounts.append({
-                'name': job['name'],
+                'name': job.settings.name,
                 'issue': issue
             })
     
@@ -60,14 +61,14 @@ def step_check_no_user_accounts(context):
 @then('jobs with "{pattern}" in the name must have service principal')
 def step_check_production_service_principals(context, pattern):
     """Ensure production jobs use service principals."""
-    production_jobs = [job for job in context.all_jobs if pattern.lower() in job['name'].lower()]
+    production_jobs = [job for job in context.all_jobs if pattern.lower() in job.settings.name.lower()]
     context.prod_jobs_without_sp = []
     
     for job in production_jobs:
-        is_compliant, issue = check_service_principal(job['settings'])
+        is_compliant, issue = check_service_principal(job.settings)
         if not is_compliant:
             context.prod_jobs_without_sp.append({
-                'name': job['name'],
+                'name': job.settings.name,
                 'issue': issue
             })
     
@@ -81,10 +82,10 @@ def step_check_retry_configuration(context):
     context.jobs_without_retries = []
     
     for job in context.filtered_jobs:
-        is_compliant, issue = check_retry_configuration(job['settings'])
+        is_compliant, issue = check_retry_configuration(job.settings)
         if not is_compliant:
             context.jobs_without_retries.append({
-                'name': job['name'],
+                'name': job.settings.name,
                 'issue': issue
             })
     
@@ -105,10 +106,10 @@ def step_check_timeout_defined(context):
     context.jobs_without_timeout = []
     
     for job in context.all_jobs:
-        is_compliant, issue = check_timeout_configuration(context, job['settings'])
+        is_compliant, issue = check_timeout_configuration(context, job.settings)
         if not is_compliant:
             context.jobs_without_timeout.append({
-                'name': job['name'],
+                'name': job.settings.name,
                 'issue': issue
             })
     
@@ -129,10 +130,10 @@ def step_check_new_cluster_usage(context):
     context.jobs_with_cluster_issues = []
     
     for job in context.all_jobs:
-        is_compliant, issue = check_cluster_configuration(job['settings'])
+        is_compliant, issue = check_cluster_configuration(job.settings)
         if not is_compliant:
             context.jobs_with_cluster_issues.append({
-                'name': job['name'],
+                'name': job.settings.name,
                 'issue': issue
             })
     
@@ -1,25 +1,19 @@
-from databricks.sdk import WorkspaceClient
-from typing import Optional, Tuple
+import re
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+from databricks.sdk.service.jobs import BaseJob
+from features.steps.databricks_utils import get_workspace_client
 
+# 'production' is matched by 'prod'
+_PROD_RE = re.compile(r'prod|prd', re.IGNORECASE)
 
-def get_workspace_client(context) -> WorkspaceClient:
-    """Get or create workspace client."""
-    if not hasattr(context, 'workspace_client'):
-        context.workspace_client = WorkspaceClient()
-    return context.workspace_client
 
-
-def list_all_jobs(context) -> list[dict]:
-    """List all jobs in the workspace."""
-    client = get_workspace_client(context)
-    jobs = []
-    for job in client.jobs.list():
-        jobs.append({
-            'job_id': job.job_id,
-            'name': job.settings.name,
-            'settings': job.settings
-        })
-    return jobs
+def iter_jobs(context, expand_tasks: bool = False) -> Iterator[BaseJob]:
+    """
+    Lazily page through every job in the workspace. Task definitions are only returned when
+    expand_tasks is set. The SDK's name filter is an exact match, so substring filters stay client side.
+    """
+    return get_workspace_client(context).jobs.list(expand_tasks=expand_tasks)
 
 
 def get_job_details(context, job_id: int) -> dict:
@@ -28,18 +22,21 @@ def get_job_details(context, job_id: int) -> dict:
     return client.jobs.get(job_id=job_id)
 
 
+@lru_cache(maxsize=4096)
 def is_production_job(job_name: str) -> bool:
     """Determine if a job is a production job based on naming."""
-    prod_indicators = ['prod', 'production', 'prd']
-    return any(indicator in job_name.lower() for indicator in prod_indicators)
+    return _PROD_RE.search(job_name) is not None
 
 
 def check_service_principal(job_settings) -> Tuple[bool, Optional[str]]:
     """Check if job uses service principal."""
+    # run_as carries either a user_name or a service_principal_name, never both
     run_as = getattr(job_settings, 'run_as', None)
-    if run_as and hasattr(run_as, 'user_name') and run_as.user_name and '@' in run_as.user_name:
-        return False, f"Uses user account: {run_as.user_name}"
-    if run_as and hasattr(run_as, 'service_principal_name') and run_as.service_principal_name:
+    user_name = getattr(run_as, 'user_name', None)
+    sp_name = getattr(run_as, 'service_principal_name', None)
+    if user_name:
+        return False, f"Uses user account: {user_name}"
+    if sp_name:
         return True, None
     return False, "No run_as configuration"
 
@@ -68,8 +65,8 @@ def check_timeout_configuration(context, job_settings) -> Tuple[bool, Optional[s
     if timeout_seconds is None:
         return False, "No timeout configured"
     
-    min_timeout = int(context.config.userdata.get('MIN_TIMEOUT_SECONDS', 300))
-    max_timeout = int(context.config.userdata.get('MAX_TIMEOUT_SECONDS', 86400))
+    min_timeout = context.min_timeout_seconds
+    max_timeout = context.max_timeout_seconds
     
     if timeout_seconds < min_timeout:
         return False, f"Timeout too short: {timeout_seconds}s < {min_timeout}s"
@@ -87,10 +84,9 @@ def check_cluster_configuration(job_settings) -> Tuple[bool, Optional[str]]:
         return True, None
     
     # Check tasks for cluster configuration
-    tasks = getattr(job_settings, 'tasks', [])
-    for task in tasks:
-        if hasattr(task, 'existing_cluster_id') and task.existing_cluster_id:
-            task_key = getattr(task, 'task_key', 'unknown')
-            return False, f"Task '{task_key}' uses existing cluster"
+    tasks = getattr(job_settings, 'tasks', None) or []
+    bad = next((task for task in tasks if getattr(task, 'existing_cluster_id', None)), None)
+    if bad is not None:
+        return False, f"Task '{getattr(bad, 'task_key', 'unknown')}' uses existing cluster"
     
     return True, None
\ No newline at end of file
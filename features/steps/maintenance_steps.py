@@ -1,33 +1,58 @@
+from functools import partial
 from behave import given, when, then
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from features.steps.databricks_utils import execute_query, for_each_table, get_table_properties
-
-
-def get_table_history(context, table_name: str) -> list[dict]:
-    """Retrieve table history including VACUUM operations."""
-    query = f"DESCRIBE HISTORY {table_name}"
-    result = execute_query(context, query)
-    
-    # Convert result to list of dictionaries
-    if hasattr(result, 'result') and result.result and result.result.data_array:
-        columns = [col.name for col in result.manifest.schema.columns]
-        history = []
-        for row in result.result.data_array:
-            history.append(dict(zip(columns, row)))
-        return history
-    return []
+from features.steps.databricks_utils import (
+    describe_columns, execute_query, for_each_table, get_table_detail, get_table_properties, get_workspace_client,
+    iter_rows, truncation_note
+)
+
+# Delta records a VACUUM as a START/END pair, END marks a completed run
+VACUUM_OPERATIONS = {'VACUUM', 'VACUUM END'}
+
+# DESCRIBE HISTORY's fixed schema, so the columns needn't be read from every result's manifest
+_DESCRIBE_HISTORY_COLS = (
+    'version', 'timestamp', 'userId', 'userName', 'operation', 'operationParameters', 'job', 'notebook',
+    'clusterId', 'readVersion', 'isolationLevel', 'isBlindAppend', 'operationMetrics', 'userMetadata', 'engineInfo'
+)
+_HISTORY_TIMESTAMP_IDX = _DESCRIBE_HISTORY_COLS.index('timestamp')
+_HISTORY_OPERATION_IDX = _DESCRIBE_HISTORY_COLS.index('operation')
+
+
+def _fast_parse_ts(value: str) -> datetime:
+    """
+    Parse a warehouse timestamp ('YYYY-MM-DD HH:MM:SS[.fff]Z', space or 'T' separated) as an aware
+    UTC datetime by slicing the fixed-width fields. Fractional seconds are dropped; anything else
+    goes through fromisoformat, with timestamps lacking an offset taken as UTC.
+    """
+    if len(value) == 19 or value.endswith('Z'):
+        try:
+            return datetime(
+                int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]), tzinfo=timezone.utc
+            )
+        except ValueError:
+            pass
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
 
 
 def get_table_last_vacuum(context, table_name: str) -> Optional[datetime]:
     """Get the timestamp of the last VACUUM operation."""
-    history = get_table_history(context, table_name)
+    # DESCRIBE HISTORY cannot be filtered in SQL, so scan its rows (newest first) in place and stop
+    # at the first VACUUM rather than building a dict for every history entry
+    result = execute_query(context, f"DESCRIBE HISTORY {table_name}")
+    if not (result.result and result.result.data_array):
+        return None
     
-    for operation in history:
-        if operation.get('operation') == 'VACUUM':
-            timestamp_str = operation.get('timestamp')
-            if timestamp_str:
-                return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+    columns = describe_columns(result, _DESCRIBE_HISTORY_COLS)
+    if columns is _DESCRIBE_HISTORY_COLS:
+        operation_idx, timestamp_idx = _HISTORY_OPERATION_IDX, _HISTORY_TIMESTAMP_IDX
+    else:
+        operation_idx, timestamp_idx = columns.index('operation'), columns.index('timestamp')
+    for row in iter_rows(get_workspace_client(context), result):
+        if row[operation_idx] in VACUUM_OPERATIONS and row[timestamp_idx]:
+            return _fast_parse_ts(row[timestamp_idx])
     
     return None
 
@@ -43,23 +68,19 @@ def check_vacuum_compliance(context, detail, catalog, schema, table) -> bool:
     if not last_vacuum:
         return False
     
-    days_threshold = int(context.config.userdata.get('VACUUM_DAYS_THRESHOLD', 30))
-    days_since_vacuum = (datetime.now() - last_vacuum.replace(tzinfo=None)).days
+    days_since_vacuum = (context._now_utc - last_vacuum).days
     
-    return days_since_vacuum <= days_threshold
+    return days_since_vacuum <= context.vacuum_days_threshold
 
 
 def get_table_access_info(context, table_name: str) -> dict:
     """Get table access information from query history or metadata."""
     # This would ideally use query history API or custom tracking
     # For now, we'll use table metadata as a proxy
-    query = f"DESCRIBE DETAIL {table_name}"
-    result = execute_query(context, query)
+    catalog, schema, table = table_name.split(".", 2)
+    detail = get_table_detail(get_workspace_client(context), catalog, schema, table)
     
-    if hasattr(result, 'result') and result.result and result.result.data_array:
-        columns = [col.name for col in result.manifest.schema.columns]
-        values = result.result.data_array[0]
-        detail = dict(zip(columns, values))
+    if detail:
         return {
             'last_modified': detail.get('lastModified'),
             'num_files': detail.get('numFiles', 0),
@@ -82,16 +103,14 @@ def check_table_usage(context, detail, catalog, schema, table) -> bool:
         # Parse the timestamp - handle different formats
         try:
             if isinstance(last_modified, str):
-                # Remove timezone info for parsing
-                last_modified_clean = last_modified.replace('Z', '').replace('+00:00', '')
-                last_modified_dt = datetime.fromisoformat(last_modified_clean)
+                last_modified_dt = _fast_parse_ts(last_modified)
             else:
-                last_modified_dt = last_modified
+                # Naive timestamps from the warehouse are UTC, as in _fast_parse_ts
+                last_modified_dt = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
                 
-            days_since_modified = (datetime.now() - last_modified_dt).days
-            threshold = int(context.config.userdata.get('ORPHAN_DAYS_THRESHOLD', 90))
+            days_since_modified = (context._now_utc - last_modified_dt).days
             
-            return days_since_modified <= threshold
+            return days_since_modified <= context.orphan_days_threshold
         except (ValueError, TypeError):
             # If we can't parse the timestamp, assume it's not orphaned
             return True
@@ -117,19 +136,13 @@ def step_check_table_history_permissions(context):
 @when('I check the table history for VACUUM operations')
 def step_check_vacuum_history(context):
     """Check VACUUM history for all tables."""
-    def check_vacuum(detail, catalog, schema, table):
-        return check_vacuum_compliance(context, detail, catalog, schema, table)
-    
-    for_each_table(context, context.catalog_schema, check_vacuum, 'tables_needing_vacuum')
+    for_each_table(context, context.catalog_schema, partial(check_vacuum_compliance, context), 'tables_needing_vacuum')
 
 
 @when('I check table access patterns')
 def step_check_table_access(context):
     """Analyze table access patterns for orphaned tables."""
-    def check_usage(detail, catalog, schema, table):
-        return check_table_usage(context, detail, catalog, schema, table)
-    
-    for_each_table(context, context.catalog_schema, check_usage, 'potentially_orphaned_tables')
+    for_each_table(context, context.catalog_schema, partial(check_table_usage, context), 'potentially_orphaned_tables')
 
 
 @then('each table should have a VACUUM operation within the last {days:d} days')
@@ -137,15 +150,7 @@ def step_assert_vacuum_recent(context, days):
     """Assert that tables have been vacuumed recently."""
     failed_tables = getattr(context, 'tables_needing_vacuum', [])
     assert len(failed_tables) == 0, \
-        f"Found {len(failed_tables)} tables that haven't been vacuumed in {days} days: {failed_tables}"
-
-
-@then('each table should have a VACUUM operation within the last 30 days')
-def step_assert_vacuum_recent_default(context):
-    """Assert that tables have been vacuumed within default threshold."""
-    failed_tables = getattr(context, 'tables_needing_vacuum', [])
-    assert len(failed_tables) == 0, \
-        f"Found {len(failed_tables)} tables that need vacuuming: {failed_tables}"
+        f"Found {len(failed_tables)} tables that haven't been vacuumed in {days} days: {failed_tables}{truncation_note(context, 'tables_needing_vacuum')}"
 
 
 @then('Or have a "no_vacuum_needed" tag')
@@ -161,7 +166,7 @@ def step_flag_orphaned_tables(context):
     failed_tables = getattr(context, 'potentially_orphaned_tables', [])
     # Don't assert here - this is for identification only
     if failed_tables:
-        print(f"Potentially orphaned tables found: {failed_tables}")
+        print(f"Potentially orphaned tables found: {failed_tables}{truncation_note(context, 'potentially_orphaned_tables')}")
 
 
 @then('no reads in the last {days:d} days')
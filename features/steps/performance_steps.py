@@ -1,19 +1,30 @@
+import re
+from functools import lru_cache, partial
 from behave import given, when, then
-from features.steps.databricks_utils import execute_query, for_each_table
+from features.steps.databricks_utils import (
+    execute_query, for_each_table, get_schema_columns, get_table_detail, get_workspace_client, iter_rows,
+    metadata_cache, truncation_note
+)
+
+# Partition column names that suggest high cardinality
+_HIGH_CARDINALITY_RE = re.compile(r'id|uuid|guid|timestamp', re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def is_high_cardinality_column(column_name: str) -> bool:
+    """Whether a partition column's name suggests high cardinality."""
+    return _HIGH_CARDINALITY_RE.search(column_name) is not None
 
 
 def get_table_file_metrics(context, table_name: str) -> dict:
     """Get detailed file metrics for a table."""
-    query = f"DESCRIBE DETAIL {table_name}"
-    result = execute_query(context, query)
+    catalog, schema, table = table_name.split(".", 2)
+    # DESCRIBE DETAIL is cached, so repeated metric lookups for a table share one round trip
+    detail = get_table_detail(get_workspace_client(context), catalog, schema, table)
     
-    if hasattr(result, 'result') and result.result and result.result.data_array:
-        columns = [col.name for col in result.manifest.schema.columns]
-        values = result.result.data_array[0]
-        detail = dict(zip(columns, values))
-        
-        num_files = int(detail.get('numFiles', 0))
-        size_in_bytes = int(detail.get('sizeInBytes', 0))
+    if detail:
+        num_files = int(detail.get('numFiles') or 0)
+        size_in_bytes = int(detail.get('sizeInBytes') or 0)
         
         avg_file_size = size_in_bytes / num_files if num_files > 0 else 0
         
@@ -25,11 +36,10 @@ def get_table_file_metrics(context, table_name: str) -> dict:
     return {}
 
 
-def count_small_files(context, table_name: str, threshold_mb: int = 10) -> int:
-    """Count files smaller than threshold."""
+def count_small_files(metrics: dict, threshold_mb: int = 10) -> int:
+    """Count files smaller than threshold, from the metrics returned by get_table_file_metrics."""
     # This would require accessing file-level metadata
     # Simplified implementation using estimates
-    metrics = get_table_file_metrics(context, table_name)
     avg_size_mb = metrics.get('avg_file_size_mb', 0)
     
     if avg_size_mb < threshold_mb:
@@ -38,25 +48,15 @@ def count_small_files(context, table_name: str, threshold_mb: int = 10) -> int:
     return 0
 
 
+@metadata_cache
 def get_partition_info(context, table_name: str) -> dict:
     """Get partition information for a table."""
-    # Get partition columns
-    query = f"DESCRIBE TABLE {table_name}"
-    result = execute_query(context, query)
-    
-    partition_cols = []
-    if hasattr(result, 'result') and result.result and result.result.data_array:
-        in_partition_section = False
-        for row in result.result.data_array:
-            if len(row) >= 1:
-                col_name = row[0] if row[0] else ''
-                if col_name == '# Partition Information':
-                    in_partition_section = True
-                    continue
-                elif col_name.startswith('#'):
-                    in_partition_section = False
-                elif in_partition_section and col_name and not col_name.startswith('#'):
-                    partition_cols.append(col_name)
+    # Partition columns come from the schema wide information_schema.columns prefetch,
+    # so unpartitioned tables cost no round trip at all
+    catalog, schema, table = table_name.split(".", 2)
+    columns = get_schema_columns(context, catalog, schema).get(table, [])
+    partitioned = [col for col in columns if col['partition_index'] is not None]
+    partition_cols = [col['name'] for col in sorted(partitioned, key=lambda col: int(col['partition_index']))]
     
     # Count partitions
     partition_count = 0
@@ -64,8 +64,7 @@ def get_partition_info(context, table_name: str) -> dict:
         try:
             partition_count_query = f"SHOW PARTITIONS {table_name}"
             partitions_result = execute_query(context, partition_count_query)
-            if hasattr(partitions_result, 'result') and partitions_result.result:
-                partition_count = len(partitions_result.result.data_array or [])
+            partition_count = sum(1 for _ in iter_rows(get_workspace_client(context), partitions_result))
         except:
             # If SHOW PARTITIONS fails, assume 0 partitions
             partition_count = 0
@@ -86,7 +85,7 @@ def check_file_sizing(context, detail, catalog, schema, table) -> bool:
         return False
     
     # Check small file count
-    small_files = count_small_files(context, f"{catalog}.{schema}.{table}")
+    small_files = count_small_files(metrics)
     if small_files > 10000:
         return False
     
@@ -107,12 +106,7 @@ def check_partition_health(context, detail, catalog, schema, table) -> bool:
         return False
     
     # Check for high-cardinality columns (simplified check)
-    high_cardinality_indicators = ['id', 'uuid', 'guid', 'timestamp']
-    for col in partition_cols:
-        if any(indicator in col.lower() for indicator in high_cardinality_indicators):
-            return False
-    
-    return True
+    return not any(is_high_cardinality_column(col) for col in partition_cols)
 
 
 @given('I have permissions to read table and cluster metadata')
@@ -129,19 +123,13 @@ def step_check_performance_permissions(context):
 @when('I analyze the file metrics for each table')
 def step_analyze_file_metrics(context):
     """Analyze file sizing for all tables."""
-    def check_files(detail, catalog, schema, table):
-        return check_file_sizing(context, detail, catalog, schema, table)
-    
-    for_each_table(context, context.catalog_schema, check_files, 'tables_with_file_issues')
+    for_each_table(context, context.catalog_schema, partial(check_file_sizing, context), 'tables_with_file_issues')
 
 
 @when('I count the number of partitions per table')
 def step_analyze_partitions(context):
     """Analyze partition health for all tables."""
-    def check_partitions(detail, catalog, schema, table):
-        return check_partition_health(context, detail, catalog, schema, table)
-    
-    for_each_table(context, context.catalog_schema, check_partitions, 'tables_with_partition_issues')
+    for_each_table(context, context.catalog_schema, partial(check_partition_health, context), 'tables_with_partition_issues')
 
 
 @then('the average file size should be between {min_size:d}MB and {max_size}')
@@ -155,7 +143,7 @@ def step_check_file_size_range(context, min_size, max_size):
     
     failed_tables = getattr(context, 'tables_with_file_issues', [])
     assert len(failed_tables) == 0, \
-        f"Found {len(failed_tables)} tables with file sizing issues: {failed_tables}"
+        f"Found {len(failed_tables)} tables with file sizing issues: {failed_tables}{truncation_note(context, 'tables_with_file_issues')}"
 
 
 @then('no table should have more than {max_files:d} files under {size_threshold:d}MB')
@@ -164,7 +152,7 @@ def step_check_small_file_count(context, max_files, size_threshold):
     # This is handled in the file sizing check
     failed_tables = getattr(context, 'tables_with_file_issues', [])
     assert len(failed_tables) == 0, \
-        f"Found {len(failed_tables)} tables with too many small files: {failed_tables}"
+        f"Found {len(failed_tables)} tables with too many small files: {failed_tables}{truncation_note(context, 'tables_with_file_issues')}"
 
 
 @then('no table should have more than {max_partitions:d} partitions')
@@ -172,7 +160,7 @@ def step_check_partition_count(context, max_partitions):
     """Validate partition count is reasonable."""
     failed_tables = getattr(context, 'tables_with_partition_issues', [])
     assert len(failed_tables) == 0, \
-        f"Found {len(failed_tables)} tables with partition issues: {failed_tables}"
+        f"Found {len(failed_tables)} tables with partition issues: {failed_tables}{truncation_note(context, 'tables_with_partition_issues')}"
 
 
 @then('partition columns should not include high-cardinality fields')
@@ -181,7 +169,7 @@ def step_check_partition_cardinality(context):
     # This is handled in the partition health check
     failed_tables = getattr(context, 'tables_with_partition_issues', [])
     assert len(failed_tables) == 0, \
-        f"Found {len(failed_tables)} tables with high-cardinality partition columns: {failed_tables}"
+        f"Found {len(failed_tables)} tables with high-cardinality partition columns: {failed_tables}{truncation_note(context, 'tables_with_partition_issues')}"
 
 
 @then('average partition size should be at least {min_size:d}MB')
@@ -190,4 +178,4 @@ def step_check_partition_size(context, min_size):
     # This would require more complex calculation - for now covered by partition health check
     failed_tables = getattr(context, 'tables_with_partition_issues', [])
     assert len(failed_tables) == 0, \
-        f"Found {len(failed_tables)} tables with partition size issues: {failed_tables}"
\ No newline at end of file
+        f"Found {len(failed_tables)} tables with partition size issues: {failed_tables}{truncation_note(context, 'tables_with_partition_issues')}"
\ No newline at end of file
@@ -1,13 +1,12 @@
 from behave import when, then
-from databricks_utils import list_tables_in_schema
+from features.steps.databricks_utils import get_workspace_client, schema_table_names
 
 
 @when('I check for the table "{table_full_name}"')
 def step_check_table_exists(context, table_full_name):
     catalog, schema, table = table_full_name.split(".", 2)
-    tables = list_tables_in_schema(context.dbx, catalog, schema)
     context.table_full_name = table_full_name
-    context.table_found = table in tables
+    context.table_found = table in schema_table_names(get_workspace_client(context), catalog, schema)
 
 
 @then("the table should exist")
@@ -1,9 +1,7 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from databricks.sdk import WorkspaceClient
 
-from dotenv import load_dotenv
-load_dotenv()
-
 # Configuration
 TABLE_CLUSTERED = "clustered_table"
 TABLE_AUTO_CLUSTERED = "auto_clustered_table"
@@ -71,13 +69,21 @@ def create_no_clustering_table(dbx: WorkspaceClient, catalog: str, schema: str,
     )
 
 
-def set_dbx_tables(catalog: str, schema: str):
-    dbx = WorkspaceClient()
+def set_dbx_tables(catalog: str, schema: str, dbx: WorkspaceClient = None):
+    dbx = dbx or WorkspaceClient()
     create_schema(dbx, catalog, schema)
-    drop_table_if_exists(dbx, catalog, schema, TABLE_CLUSTERED)
-    drop_table_if_exists(dbx, catalog, schema, TABLE_AUTO_CLUSTERED)
-    drop_table_if_exists(dbx, catalog, schema, TABLE_NO_CLUSTERING)
-    create_clustered_table(dbx, catalog, schema, TABLE_CLUSTERED)
-    create_auto_clustered_table(dbx, catalog, schema, TABLE_AUTO_CLUSTERED)
-    create_no_clustering_table(dbx, catalog, schema, TABLE_NO_CLUSTERING)
+    
+    table_creators = {
+        TABLE_CLUSTERED: create_clustered_table,
+        TABLE_AUTO_CLUSTERED: create_auto_clustered_table,
+        TABLE_NO_CLUSTERING: create_no_clustering_table,
+    }
+    
+    def recreate_table(table: str):
+        drop_table_if_exists(dbx, catalog, schema, table)
+        table_creators[table](dbx, catalog, schema, table)
+    
+    # Each table's drop has to land before its create, but the tables are independent of each other
+    with ThreadPoolExecutor(max_workers=len(table_creators)) as executor:
+        list(executor.map(recreate_table, table_creators))
     print("Schema and test tables created.")